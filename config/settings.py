@@ -37,6 +37,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     
     # Third party
     'rest_framework',
@@ -87,10 +88,24 @@ DATABASES = {
         'USER': env('DB_USER', default='inventory_user'),
         'PASSWORD': env('DB_PASSWORD', default='password'),
         'HOST': env('DB_HOST', default='db'),
-        'PORT': env('DB_PORT', default='5432')
+        'PORT': env('DB_PORT', default='5432'),
+        # Reuse connections across requests instead of reconnecting every time
+        'CONN_MAX_AGE': env.int('DB_CONN_MAX_AGE', default=60),
+        'CONN_HEALTH_CHECKS': True,
+        # Must be True behind pgbouncer in transaction pooling mode
+        'DISABLE_SERVER_SIDE_CURSORS': env.bool('DB_DISABLE_SERVER_SIDE_CURSORS', default=False),
     }
 }
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Use a shared backend (e.g. redis://redis:6379/1) when running several workers,
+# otherwise cache invalidation only reaches the worker that handled the write.
+
+CACHES = {
+    'default': env.cache('CACHE_URL', default='locmemcache://'),
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -1,4 +1,5 @@
 from django.contrib import admin
+from django.db.models import Count
 from .models import Category, Product, StockMovement
 
 
@@ -8,9 +9,13 @@ class CategoryAdmin(admin.ModelAdmin):
     search_fields = ['name', 'description']
     readonly_fields = ['created_at', 'updated_at']
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(product_count=Count('products'))
+
     def product_count(self, obj):
-        return obj.products.count()
+        return obj.product_count
     product_count.short_description = 'Products'
+    product_count.admin_order_field = 'product_count'
 
 
 @admin.register(Product)
@@ -0,0 +1,22 @@
+from django.core.cache import cache
+
+
+CATEGORY_LIST_VERSION_KEY = 'cat:list:version'
+CATEGORY_LIST_TIMEOUT = 300
+
+
+def category_list_cache_key(query_string):
+    """
+    Build the cache key for a category list response. The key embeds a version
+    number so every cached page can be invalidated at once by bumping it.
+    """
+    version = cache.get_or_set(CATEGORY_LIST_VERSION_KEY, 1, timeout=None)
+    return f"cat:list:{version}:{query_string}"
+
+
+def invalidate_category_list():
+    try:
+        cache.incr(CATEGORY_LIST_VERSION_KEY)
+    except ValueError:
+        # Version key was evicted; any pages cached under it are unreachable anyway
+        cache.set(CATEGORY_LIST_VERSION_KEY, 1, timeout=None)
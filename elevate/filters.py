@@ -0,0 +1,16 @@
+import django_filters
+
+from .models import Product
+
+
+class ProductFilterSet(django_filters.FilterSet):
+    low_stock = django_filters.BooleanFilter(method='filter_low_stock')
+
+    class Meta:
+        model = Product
+        fields = ['category', 'status']
+
+    def filter_low_stock(self, queryset, name, value):
+        if value:
+            return queryset.filter(needs_reorder=True)
+        return queryset
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.7 on 2026-10-14 17:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('elevate', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['stock_quantity', 'reorder_level'], name='prod_stock_reorder_idx'),
+        ),
+    ]
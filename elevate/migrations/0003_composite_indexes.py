@@ -0,0 +1,33 @@
+# Generated by Django 5.2.7 on 2026-10-14 17:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('elevate', '0002_product_stock_reorder_index'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='product',
+            name='elevate_pro_sku_d6bb89_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='product',
+            name='elevate_pro_name_8da2cd_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='product',
+            name='elevate_pro_status_408252_idx',
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['status', 'category', '-created_at'], name='prod_status_cat_ct_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stockmovement',
+            index=models.Index(fields=['product', '-created_at'], name='stockmove_prod_ct_idx'),
+        ),
+    ]
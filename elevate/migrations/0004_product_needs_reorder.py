@@ -0,0 +1,27 @@
+# Generated by Django 5.2.7 on 2026-10-14 17:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('elevate', '0003_composite_indexes'),
+    ]
+
+    operations = [
+        # Superseded by the needs_reorder partial index
+        migrations.RemoveIndex(
+            model_name='product',
+            name='prod_stock_reorder_idx',
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='needs_reorder',
+            field=models.GeneratedField(db_persist=True, expression=models.Q(('stock_quantity__lte', models.F('reorder_level'))), output_field=models.BooleanField()),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('needs_reorder', True)), fields=['needs_reorder'], name='prod_needs_reorder_partial'),
+        ),
+    ]
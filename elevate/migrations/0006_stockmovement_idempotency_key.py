@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-14 17:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('elevate', '0005_product_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='stockmovement',
+            name='idempotency_key',
+            field=models.CharField(blank=True, max_length=64, null=True, unique=True),
+        ),
+    ]
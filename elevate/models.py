@@ -1,4 +1,7 @@
+from django.contrib.postgres.indexes import GinIndex, OpClass
 from django.db import models
+from django.db.models import F, Q, TextField
+from django.db.models.functions import Cast, Upper
 from django.core.validators import MinValueValidator
 from decimal import Decimal
 
@@ -49,24 +52,43 @@ class Product(models.Model):
         choices=STATUS_CHOICES, 
         default='active'
     )
+    # Kept in sync by the database, including for queryset.update() calls
+    needs_reorder = models.GeneratedField(
+        expression=Q(stock_quantity__lte=F('reorder_level')),
+        output_field=models.BooleanField(),
+        db_persist=True
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['-created_at']
         indexes = [
-            models.Index(fields=['sku']),
-            models.Index(fields=['name']),
-            models.Index(fields=['status']),
+            models.Index(fields=['status', 'category', '-created_at'], name='prod_status_cat_ct_idx'),
+            models.Index(
+                fields=['needs_reorder'],
+                condition=Q(needs_reorder=True),
+                name='prod_needs_reorder_partial'
+            ),
+            # Trigram indexes matching the UPPER(col::text) LIKE that icontains
+            # (and so SearchFilter) compiles to on PostgreSQL
+            GinIndex(
+                OpClass(Upper(Cast('name', TextField())), name='gin_trgm_ops'),
+                name='prod_name_trgm_idx'
+            ),
+            GinIndex(
+                OpClass(Upper(Cast('sku', TextField())), name='gin_trgm_ops'),
+                name='prod_sku_trgm_idx'
+            ),
+            GinIndex(
+                OpClass(Upper('description'), name='gin_trgm_ops'),
+                name='prod_description_trgm_idx'
+            ),
         ]
 
     def __str__(self):
         return f"{self.sku} - {self.name}"
 
-    @property
-    def needs_reorder(self):
-        return self.stock_quantity <= self.reorder_level
-
     @property
     def is_in_stock(self):
         return self.stock_quantity > 0
@@ -87,10 +109,15 @@ class StockMovement(models.Model):
     movement_type = models.CharField(max_length=20, choices=MOVEMENT_TYPES)
     quantity = models.IntegerField(validators=[MinValueValidator(1)])
     notes = models.TextField(blank=True)
+    # Client-supplied key so retried requests do not record a movement twice
+    idempotency_key = models.CharField(max_length=64, null=True, blank=True, unique=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['product', '-created_at'], name='stockmove_prod_ct_idx'),
+        ]
 
     def __str__(self):
         return f"{self.product.sku} - {self.movement_type} - {self.quantity}"
\ No newline at end of file
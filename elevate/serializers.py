@@ -1,4 +1,8 @@
+from django.db import IntegrityError, transaction
+from django.db.models import BooleanField, Case, Count, F, IntegerField, Value, When
+from django.utils import timezone
 from rest_framework import serializers
+from rest_framework.settings import api_settings
 from drf_spectacular.utils import extend_schema_field
 from drf_spectacular.types import OpenApiTypes
 from .models import Category, Product, StockMovement
@@ -12,24 +16,61 @@ class CategorySerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'description', 'product_count', 'created_at', 'updated_at']
         read_only_fields = ['created_at', 'updated_at']
 
+    @staticmethod
+    def setup_eager_loading(queryset):
+        return queryset.annotate(product_count=Count('products'))
+
+    def create(self, validated_data):
+        instance = super().create(validated_data)
+        # A new category cannot have products yet
+        instance.product_count = 0
+        return instance
+
     @extend_schema_field(OpenApiTypes.INT)
     def get_product_count(self, obj):
-        return obj.products.count()
+        product_count = getattr(obj, 'product_count', None)
+        if product_count is None:
+            return obj.products.count()
+        return product_count
 
 
-class ProductListSerializer(serializers.ModelSerializer):
-    category_name = serializers.CharField(source='category.name', read_only=True)
-    needs_reorder = serializers.BooleanField(read_only=True)
-    is_in_stock = serializers.BooleanField(read_only=True)
+class CategoryListSerializer(CategorySerializer):
+    class Meta(CategorySerializer.Meta):
+        fields = ['id', 'name', 'product_count', 'created_at', 'updated_at']
 
-    class Meta:
-        model = Product
-        fields = [
-            'id', 'sku', 'name', 'category', 'category_name', 
-            'price', 'stock_quantity', 'status', 
-            'needs_reorder', 'is_in_stock', 'created_at'
-        ]
-        read_only_fields = ['created_at']
+
+# Serializes .values() rows instead of model instances; setup_eager_loading()
+# adds the stock flag annotations and the projection.
+class ProductListSerializer(serializers.Serializer):
+    id = serializers.IntegerField(read_only=True)
+    sku = serializers.CharField(read_only=True)
+    name = serializers.CharField(read_only=True)
+    category = serializers.IntegerField(read_only=True)
+    category_name = serializers.CharField(source='category__name', read_only=True)
+    price = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
+    stock_quantity = serializers.IntegerField(read_only=True)
+    status = serializers.ChoiceField(choices=Product.STATUS_CHOICES, read_only=True)
+    needs_reorder = serializers.BooleanField(source='needs_reorder_db', read_only=True)
+    is_in_stock = serializers.BooleanField(source='is_in_stock_db', read_only=True)
+    created_at = serializers.DateTimeField(read_only=True)
+
+    value_fields = [
+        'id', 'sku', 'name', 'category', 'category__name',
+        'price', 'stock_quantity', 'status',
+        'needs_reorder_db', 'is_in_stock_db', 'created_at'
+    ]
+
+    @classmethod
+    def setup_eager_loading(cls, queryset):
+        # Computed in SQL so the flags come back with the row and can be ordered on
+        return queryset.annotate(
+            needs_reorder_db=F('needs_reorder'),
+            is_in_stock_db=Case(
+                When(stock_quantity__gt=0, then=Value(True)),
+                default=Value(False),
+                output_field=BooleanField()
+            ),
+        ).values(*cls.value_fields)
 
 
 class ProductDetailSerializer(serializers.ModelSerializer):
@@ -46,16 +87,180 @@ class ProductDetailSerializer(serializers.ModelSerializer):
             'created_at', 'updated_at'
         ]
         read_only_fields = ['created_at', 'updated_at']
+        # Uniqueness is enforced by the database; see create()/update()
+        extra_kwargs = {'sku': {'validators': []}}
+
+    @staticmethod
+    def setup_eager_loading(queryset):
+        return queryset.select_related('category')
+
+    def create(self, validated_data):
+        try:
+            with transaction.atomic():
+                return super().create(validated_data)
+        except IntegrityError:
+            raise serializers.ValidationError({'sku': ['Product with this SKU already exists.']})
+
+    def update(self, instance, validated_data):
+        try:
+            with transaction.atomic():
+                instance = super().update(instance, validated_data)
+        except IntegrityError:
+            raise serializers.ValidationError({'sku': ['Product with this SKU already exists.']})
+
+        # needs_reorder is computed by the database and is not refreshed by save()
+        instance.refresh_from_db(fields=['needs_reorder'])
+        return instance
+
+
+class StockMovementProductField(serializers.PrimaryKeyRelatedField):
+    """
+    Read products from the bulk serializer's prefetched map instead of
+    issuing one SELECT per item. Unknown or malformed pks fall back to the
+    default lookup so the usual field errors are reported.
+    """
+
+    def to_internal_value(self, data):
+        products = getattr(self.root, 'products_by_pk', None)
+        if products is not None and not isinstance(data, bool):
+            try:
+                return products[int(data)]
+            except (KeyError, TypeError, ValueError):
+                pass
+        return super().to_internal_value(data)
+
+
+def find_recorded_movements(items):
+    """
+    Return the movements already recorded under the items' idempotency keys,
+    keyed by idempotency_key. A key recorded for a different product,
+    movement type or quantity is rejected rather than treated as a replay.
+    """
+    keys = [item['idempotency_key'] for item in items if item.get('idempotency_key')]
+    if not keys:
+        return {}
+
+    recorded = {
+        movement.idempotency_key: movement
+        for movement in StockMovement.objects.select_related('product')
+        .filter(idempotency_key__in=keys)
+    }
+    for item in items:
+        movement = recorded.get(item.get('idempotency_key'))
+        if movement is None:
+            continue
+        if (movement.product_id, movement.movement_type, movement.quantity) != (
+            item['product'].pk, item['movement_type'], item['quantity']
+        ):
+            raise serializers.ValidationError({
+                'idempotency_key': [
+                    f"Key {movement.idempotency_key} was already used for a different stock movement."
+                ]
+            })
+    return recorded
+
 
-    def validate_sku(self, value):
-        if self.instance and self.instance.sku == value:
-            return value
-        if Product.objects.filter(sku=value).exists():
-            raise serializers.ValidationError("Product with this SKU already exists.")
-        return value
+class BulkStockMovementSerializer(serializers.ListSerializer):
+    """
+    Create many stock movements with one INSERT and one stock UPDATE.
+    Items whose idempotency_key was already recorded are returned as-is.
+    """
+
+    def to_internal_value(self, data):
+        # Resolve every product in the batch with a single query
+        if isinstance(data, list):
+            product_ids = set()
+            for item in data:
+                if isinstance(item, dict) and not isinstance(item.get('product'), bool):
+                    try:
+                        product_ids.add(int(item.get('product')))
+                    except (TypeError, ValueError):
+                        pass
+            self.products_by_pk = Product.objects.only('id', 'sku', 'name').in_bulk(product_ids)
+        return super().to_internal_value(data)
+
+    def validate(self, data):
+        product_ids = [item['product'].pk for item in data]
+        if len(product_ids) != len(set(product_ids)):
+            raise serializers.ValidationError("Each product may only appear once per batch.")
+
+        keys = [item['idempotency_key'] for item in data if item.get('idempotency_key')]
+        if len(keys) != len(set(keys)):
+            raise serializers.ValidationError("Each idempotency_key may only appear once per batch.")
+        return data
+
+    def create(self, validated_data):
+        product_ids = [item['product'].pk for item in validated_data]
+        keys = [item['idempotency_key'] for item in validated_data if item.get('idempotency_key')]
+
+        with transaction.atomic():
+            # Lock in pk order so concurrent batches cannot deadlock. Holding the
+            # product locks also serializes replays of the same batch.
+            stock = dict(
+                Product.objects.select_for_update()
+                .filter(pk__in=product_ids)
+                .order_by('pk')
+                .values_list('pk', 'stock_quantity')
+            )
+            missing = set(product_ids) - set(stock)
+            if missing:
+                raise serializers.ValidationError({
+                    api_settings.NON_FIELD_ERRORS_KEY: [
+                        f"Product {pk} no longer exists." for pk in sorted(missing)
+                    ]
+                })
+
+            # Clients may share a key across products, which the row locks do not
+            # serialize; if a concurrent insert wins the unique index, roll back
+            # and re-check so the conflict is reported instead of a 500.
+            try:
+                with transaction.atomic():
+                    return self._apply(validated_data, stock)
+            except IntegrityError:
+                if not keys:
+                    raise
+            return self._apply(validated_data, stock)
+
+    def _apply(self, validated_data, stock):
+        existing = find_recorded_movements(validated_data)
+        new_items = [
+            item for item in validated_data if item.get('idempotency_key') not in existing
+        ]
+
+        whens = []
+        for item in new_items:
+            pk = item['product'].pk
+            quantity = item['quantity']
+            if item['movement_type'] == 'in':
+                whens.append(When(pk=pk, then=F('stock_quantity') + quantity))
+            elif item['movement_type'] == 'out':
+                if stock[pk] < quantity:
+                    raise serializers.ValidationError({
+                        api_settings.NON_FIELD_ERRORS_KEY: [
+                            f"Insufficient stock for {item['product'].sku}. Available: {stock[pk]}"
+                        ]
+                    })
+                whens.append(When(pk=pk, then=F('stock_quantity') - quantity))
+            elif item['movement_type'] == 'adjustment':
+                whens.append(When(pk=pk, then=Value(quantity)))
+
+        if whens:
+            Product.objects.filter(pk__in=[item['product'].pk for item in new_items]).update(
+                stock_quantity=Case(*whens, output_field=IntegerField()),
+                updated_at=timezone.now()
+            )
+
+        created = iter(StockMovement.objects.bulk_create(
+            [StockMovement(**item) for item in new_items], batch_size=500
+        ))
+        return [
+            existing.get(item.get('idempotency_key')) or next(created)
+            for item in validated_data
+        ]
 
 
 class StockMovementSerializer(serializers.ModelSerializer):
+    product = StockMovementProductField(queryset=Product.objects.all())
     product_sku = serializers.CharField(source='product.sku', read_only=True)
     product_name = serializers.CharField(source='product.name', read_only=True)
 
@@ -63,35 +268,69 @@ class StockMovementSerializer(serializers.ModelSerializer):
         model = StockMovement
         fields = [
             'id', 'product', 'product_sku', 'product_name',
-            'movement_type', 'quantity', 'notes', 'created_at'
+            'movement_type', 'quantity', 'notes', 'idempotency_key', 'created_at'
         ]
         read_only_fields = ['created_at']
+        extra_kwargs = {
+            # Uniqueness is checked in create() under the product lock
+            'idempotency_key': {'allow_blank': False, 'validators': []},
+        }
+        list_serializer_class = BulkStockMovementSerializer
 
-    def validate(self, data):
-        product = data.get('product')
-        movement_type = data.get('movement_type')
-        quantity = data.get('quantity')
-
-        if movement_type == 'out' and product.stock_quantity < quantity:
-            raise serializers.ValidationError(
-                f"Insufficient stock. Available: {product.stock_quantity}"
-            )
-        return data
+    @staticmethod
+    def setup_eager_loading(queryset):
+        return queryset.select_related('product')
 
     def create(self, validated_data):
+        with transaction.atomic():
+            product = Product.objects.select_for_update().filter(pk=validated_data['product'].pk).first()
+            if product is None:
+                # Deleted between field validation and taking the lock
+                raise serializers.ValidationError({
+                    api_settings.NON_FIELD_ERRORS_KEY: [
+                        f"Product {validated_data['product'].pk} no longer exists."
+                    ]
+                })
+            validated_data['product'] = product
+
+            # See BulkStockMovementSerializer.create for why the insert is retried
+            try:
+                with transaction.atomic():
+                    return self._apply(validated_data)
+            except IntegrityError:
+                if not validated_data.get('idempotency_key'):
+                    raise
+            return self._apply(validated_data)
+
+    def _apply(self, validated_data):
         product = validated_data['product']
         movement_type = validated_data['movement_type']
         quantity = validated_data['quantity']
 
-        # Update product stock
+        # A retried request returns the movement it already recorded
+        existing = find_recorded_movements([validated_data])
+        if existing:
+            return existing[validated_data['idempotency_key']]
+
+        products = Product.objects.filter(pk=product.pk)
+        now = timezone.now()
+
+        # Update product stock in a single UPDATE
         if movement_type == 'in':
-            product.stock_quantity += quantity
+            products.update(stock_quantity=F('stock_quantity') + quantity, updated_at=now)
         elif movement_type == 'out':
-            product.stock_quantity -= quantity
+            updated = products.filter(stock_quantity__gte=quantity).update(
+                stock_quantity=F('stock_quantity') - quantity, updated_at=now
+            )
+            if updated == 0:
+                raise serializers.ValidationError({
+                    api_settings.NON_FIELD_ERRORS_KEY: [
+                        f"Insufficient stock. Available: {product.stock_quantity}"
+                    ]
+                })
         elif movement_type == 'adjustment':
-            product.stock_quantity = quantity
+            products.update(stock_quantity=quantity, updated_at=now)
 
-        product.save()
         return super().create(validated_data)
 
 
@@ -0,0 +1,16 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .cache import invalidate_category_list
+from .models import Category, Product
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def invalidate_category_list_cache(sender, **kwargs):
+    # Product changes affect the annotated product_count. Bump the version only
+    # after commit so a concurrent read cannot cache pre-commit data under it.
+    transaction.on_commit(invalidate_category_list)
@@ -0,0 +1,347 @@
+import json
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import serializers, status
+from rest_framework.test import APITestCase
+
+from .models import Category, Product, StockMovement
+from .serializers import StockMovementSerializer
+
+
+class StockTestCase(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='tester', password='secret')
+        cls.category = Category.objects.create(name='Hardware')
+        cls.hammer = Product.objects.create(
+            sku='HAM-1', name='Hammer', category=cls.category,
+            price='9.99', stock_quantity=10, reorder_level=2
+        )
+        cls.wrench = Product.objects.create(
+            sku='WRE-1', name='Wrench', category=cls.category,
+            price='14.99', stock_quantity=5, reorder_level=2
+        )
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def assertStock(self, product, expected):
+        product.refresh_from_db()
+        self.assertEqual(product.stock_quantity, expected)
+
+
+class ProductStockTests(StockTestCase):
+    def test_stock_in_adds_quantity(self):
+        url = reverse('product-stock-in', args=[self.hammer.pk])
+        response = self.client.post(url, {'quantity': 4})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertStock(self.hammer, 14)
+        self.assertEqual(StockMovement.objects.filter(product=self.hammer, movement_type='in').count(), 1)
+
+    def test_stock_out_removes_quantity(self):
+        url = reverse('product-stock-out', args=[self.hammer.pk])
+        response = self.client.post(url, {'quantity': 4})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertStock(self.hammer, 6)
+
+    def test_stock_out_rejected_when_stock_too_low(self):
+        url = reverse('product-stock-out', args=[self.hammer.pk])
+        response = self.client.post(url, {'quantity': 11})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['error'], 'Insufficient stock. Available: 10')
+        self.assertStock(self.hammer, 10)
+        self.assertFalse(StockMovement.objects.exists())
+
+    def test_stock_movement_out_rejected_when_stock_too_low(self):
+        response = self.client.post(reverse('stock-movement-list-create'), {
+            'product': self.hammer.pk, 'movement_type': 'out', 'quantity': 11
+        })
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['non_field_errors'], ['Insufficient stock. Available: 10'])
+        self.assertStock(self.hammer, 10)
+        self.assertFalse(StockMovement.objects.exists())
+
+    def test_stock_movement_for_product_deleted_after_validation(self):
+        serializer = StockMovementSerializer(data={
+            'product': self.wrench.pk, 'movement_type': 'in', 'quantity': 1
+        })
+        self.assertTrue(serializer.is_valid())
+        Product.objects.filter(pk=self.wrench.pk).delete()
+
+        with self.assertRaises(serializers.ValidationError) as context:
+            serializer.save()
+        self.assertIn('non_field_errors', context.exception.detail)
+        self.assertFalse(StockMovement.objects.exists())
+
+
+class ProductListTests(StockTestCase):
+    def test_list_reports_stock_flags(self):
+        Product.objects.filter(pk=self.wrench.pk).update(stock_quantity=0)
+        response = self.client.get(reverse('product-list-create'))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        flags = sorted((p['sku'], p['needs_reorder'], p['is_in_stock']) for p in response.data['results'])
+        self.assertEqual(flags, [('HAM-1', False, True), ('WRE-1', True, False)])
+
+    def test_low_stock_filter_and_view(self):
+        Product.objects.filter(pk=self.wrench.pk).update(stock_quantity=1)
+
+        filtered = self.client.get(reverse('product-list-create'), {'low_stock': 'true'})
+        low_stock = self.client.get(reverse('low-stock-products'))
+
+        self.assertEqual([p['sku'] for p in filtered.data['results']], ['WRE-1'])
+        self.assertEqual([p['sku'] for p in low_stock.data['results']], ['WRE-1'])
+
+    def test_list_orders_by_stock_flag(self):
+        Product.objects.filter(pk=self.hammer.pk).update(stock_quantity=1)
+        response = self.client.get(reverse('product-list-create'), {'ordering': '-needs_reorder_db'})
+
+        self.assertEqual(response.data['results'][0]['sku'], 'HAM-1')
+
+
+class ProductSkuTests(StockTestCase):
+    def test_create_with_duplicate_sku_is_rejected(self):
+        response = self.client.post(reverse('product-list-create'), {
+            'sku': 'HAM-1', 'name': 'Another hammer',
+            'category': self.category.pk, 'price': '5.00'
+        })
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['sku'], ['Product with this SKU already exists.'])
+        self.assertEqual(Product.objects.count(), 2)
+
+    def test_update_with_duplicate_sku_is_rejected(self):
+        url = reverse('product-detail', args=[self.wrench.pk])
+        response = self.client.patch(url, {'sku': 'HAM-1', 'name': 'Renamed'})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['sku'], ['Product with this SKU already exists.'])
+        self.wrench.refresh_from_db()
+        self.assertEqual((self.wrench.sku, self.wrench.name), ('WRE-1', 'Wrench'))
+
+    def test_update_keeping_own_sku_is_allowed(self):
+        url = reverse('product-detail', args=[self.wrench.pk])
+        response = self.client.patch(url, {'sku': 'WRE-1', 'reorder_level': 10})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.data['needs_reorder'])
+
+
+class ProductExportTests(StockTestCase):
+    def test_export_streams_every_product(self):
+        response = self.client.get(reverse('product-export'))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        rows = json.loads(b''.join(response.streaming_content))
+        self.assertEqual([row['sku'] for row in rows], ['HAM-1', 'WRE-1'])
+        self.assertEqual(rows[0]['category_name'], 'Hardware')
+        self.assertFalse(rows[0]['needs_reorder'])
+        self.assertTrue(rows[0]['is_in_stock'])
+
+
+class BulkStockMovementTests(StockTestCase):
+    url = reverse('stock-movement-bulk-create')
+
+    def test_bulk_applies_each_movement_type(self):
+        drill = Product.objects.create(
+            sku='DRL-1', name='Drill', category=self.category,
+            price='49.99', stock_quantity=3
+        )
+        response = self.client.post(self.url, [
+            {'product': self.hammer.pk, 'movement_type': 'in', 'quantity': 5},
+            {'product': self.wrench.pk, 'movement_type': 'out', 'quantity': 2},
+            {'product': drill.pk, 'movement_type': 'adjustment', 'quantity': 8},
+        ], format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual([item['product'] for item in response.data], [self.hammer.pk, self.wrench.pk, drill.pk])
+        self.assertStock(self.hammer, 15)
+        self.assertStock(self.wrench, 3)
+        self.assertStock(drill, 8)
+        self.assertEqual(StockMovement.objects.count(), 3)
+
+    def test_bulk_rolls_back_when_one_item_fails(self):
+        response = self.client.post(self.url, [
+            {'product': self.hammer.pk, 'movement_type': 'in', 'quantity': 5},
+            {'product': self.wrench.pk, 'movement_type': 'out', 'quantity': 6},
+        ], format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['non_field_errors'], ['Insufficient stock for WRE-1. Available: 5'])
+        self.assertStock(self.hammer, 10)
+        self.assertStock(self.wrench, 5)
+        self.assertFalse(StockMovement.objects.exists())
+
+    def test_bulk_rejects_duplicate_products(self):
+        response = self.client.post(self.url, [
+            {'product': self.hammer.pk, 'movement_type': 'in', 'quantity': 1},
+            {'product': self.hammer.pk, 'movement_type': 'in', 'quantity': 1},
+        ], format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertStock(self.hammer, 10)
+
+    def test_bulk_rejects_oversized_batch(self):
+        payload = [
+            {'product': self.hammer.pk, 'movement_type': 'in', 'quantity': 1}
+        ] * 501
+        response = self.client.post(self.url, payload, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['non_field_errors'][0].code, 'max_length')
+        self.assertStock(self.hammer, 10)
+
+    def test_bulk_resolves_products_in_one_query(self):
+        payload = [
+            {'product': self.hammer.pk, 'movement_type': 'in', 'quantity': 1},
+            {'product': self.wrench.pk, 'movement_type': 'in', 'quantity': 1},
+        ]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(self.url, payload, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        product_selects = [
+            query for query in queries.captured_queries
+            if query['sql'].startswith('SELECT') and 'FROM "elevate_product"' in query['sql']
+        ]
+        # One lookup for validation, one for the row lock
+        self.assertEqual(len(product_selects), 2)
+
+
+class IdempotentStockMovementTests(StockTestCase):
+    def test_replayed_movement_is_applied_once(self):
+        payload = {
+            'product': self.hammer.pk, 'movement_type': 'in',
+            'quantity': 3, 'idempotency_key': 'receipt-1'
+        }
+        first = self.client.post(reverse('stock-movement-list-create'), payload)
+        second = self.client.post(reverse('stock-movement-list-create'), payload)
+
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(second.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(first.data['id'], second.data['id'])
+        self.assertStock(self.hammer, 13)
+        self.assertEqual(StockMovement.objects.count(), 1)
+
+    def test_replayed_bulk_batch_is_applied_once(self):
+        url = reverse('stock-movement-bulk-create')
+        payload = [
+            {'product': self.hammer.pk, 'movement_type': 'in', 'quantity': 3, 'idempotency_key': 'batch-1'},
+            {'product': self.wrench.pk, 'movement_type': 'out', 'quantity': 2, 'idempotency_key': 'batch-2'},
+        ]
+        first = self.client.post(url, payload, format='json')
+        second = self.client.post(url, payload, format='json')
+
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(second.status_code, status.HTTP_201_CREATED)
+        self.assertEqual([m['id'] for m in first.data], [m['id'] for m in second.data])
+        self.assertStock(self.hammer, 13)
+        self.assertStock(self.wrench, 3)
+        self.assertEqual(StockMovement.objects.count(), 2)
+
+    def test_key_reused_with_different_payload_is_rejected(self):
+        self.client.post(reverse('stock-movement-list-create'), {
+            'product': self.hammer.pk, 'movement_type': 'in',
+            'quantity': 3, 'idempotency_key': 'receipt-1'
+        })
+        response = self.client.post(reverse('stock-movement-list-create'), {
+            'product': self.wrench.pk, 'movement_type': 'out',
+            'quantity': 1, 'idempotency_key': 'receipt-1'
+        })
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('idempotency_key', response.data)
+        self.assertStock(self.wrench, 5)
+        self.assertEqual(StockMovement.objects.count(), 1)
+
+    def test_bulk_key_reused_with_different_payload_is_rejected(self):
+        self.client.post(reverse('stock-movement-list-create'), {
+            'product': self.hammer.pk, 'movement_type': 'in',
+            'quantity': 3, 'idempotency_key': 'receipt-1'
+        })
+        response = self.client.post(reverse('stock-movement-bulk-create'), [
+            {'product': self.wrench.pk, 'movement_type': 'in', 'quantity': 4},
+            {'product': self.hammer.pk, 'movement_type': 'in', 'quantity': 5, 'idempotency_key': 'receipt-1'},
+        ], format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('idempotency_key', response.data)
+        self.assertStock(self.hammer, 13)
+        self.assertStock(self.wrench, 5)
+
+
+class CategoryTestCase(APITestCase):
+    url = reverse('category-list-create')
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='tester', password='secret')
+        cls.category = Category.objects.create(name='Hardware', description='Tools and fixings')
+
+    def setUp(self):
+        # The category list is cached across requests
+        cache.clear()
+        self.client.force_authenticate(self.user)
+
+
+class CategoryListTests(CategoryTestCase):
+    def test_list_omits_description_by_default(self):
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn('description', response.data['results'][0])
+
+    def test_list_includes_description_when_requested(self):
+        response = self.client.get(self.url, {'include': 'description'})
+
+        self.assertEqual(response.data['results'][0]['description'], 'Tools and fixings')
+
+    def test_head_does_not_cache_descriptions_for_get(self):
+        self.client.head(self.url)
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn('description', response.data['results'][0])
+
+
+class CategoryListCacheTests(CategoryTestCase):
+    def test_repeated_list_is_served_from_cache(self):
+        first = self.client.get(self.url)
+        with self.assertNumQueries(0):
+            second = self.client.get(self.url)
+
+        self.assertEqual(first.data, second.data)
+
+    def test_creating_category_invalidates_cached_list(self):
+        self.assertEqual(self.client.get(self.url).data['count'], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(self.url, {'name': 'Garden'})
+
+        self.assertEqual(self.client.get(self.url).data['count'], 2)
+
+    def test_creating_product_invalidates_cached_product_count(self):
+        self.assertEqual(self.client.get(self.url).data['results'][0]['product_count'], 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Product.objects.create(sku='SAW-1', name='Saw', category=self.category, price='19.99')
+
+        self.assertEqual(self.client.get(self.url).data['results'][0]['product_count'], 1)
+
+    def test_cache_is_kept_until_commit(self):
+        self.client.get(self.url)
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            Product.objects.create(sku='SAW-1', name='Saw', category=self.category, price='19.99')
+            # Not committed yet, so the cached page is still served
+            self.assertEqual(self.client.get(self.url).data['results'][0]['product_count'], 0)
+
+        self.assertEqual(len(callbacks), 1)
@@ -4,7 +4,9 @@ from .views import (
     CategoryRetrieveUpdateDestroyView,
     ProductListCreateView,
     ProductRetrieveUpdateDestroyView,
+    ProductExportView,
     StockMovementListCreateView,
+    StockMovementBulkCreateView,
     ProductStockInView,
     ProductStockOutView,
     LowStockProductsView,
@@ -19,9 +21,11 @@ urlpatterns = [
     path('api/products/', ProductListCreateView.as_view(), name='product-list-create'),
     path('api/products/<int:pk>/', ProductRetrieveUpdateDestroyView.as_view(), name='product-detail'),
     path('api/products/low-stock/', LowStockProductsView.as_view(), name='low-stock-products'),
+    path('api/products/export/', ProductExportView.as_view(), name='product-export'),
     
     # Stock Management
     path('api/stock-movements/', StockMovementListCreateView.as_view(), name='stock-movement-list-create'),
+    path('api/stock-movements/bulk/', StockMovementBulkCreateView.as_view(), name='stock-movement-bulk-create'),
     path('api/products/<int:pk>/stock-in/', ProductStockInView.as_view(), name='product-stock-in'),
     path('api/products/<int:pk>/stock-out/', ProductStockOutView.as_view(), name='product-stock-out'),
 ]
\ No newline at end of file
@@ -2,16 +2,25 @@ from rest_framework import generics, status, filters
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.utils.encoders import JSONEncoder
 from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiExample
 from drf_spectacular.types import OpenApiTypes
-from django.db import models
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.http import StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
 from django_filters.rest_framework import DjangoFilterBackend
 
 
 
+from .cache import CATEGORY_LIST_TIMEOUT, category_list_cache_key
+from .filters import ProductFilterSet
 from .models import Category, Product, StockMovement
 from .serializers import (
     CategorySerializer, 
+    CategoryListSerializer,
     ProductListSerializer, 
     ProductDetailSerializer,
     StockMovementSerializer,
@@ -19,21 +28,69 @@ from .serializers import (
 )
 
 
+class EagerLoadingMixin:
+    """
+    Let the serializer declare the joins/prefetches it needs via setup_eager_loading().
+    """
+
+    def get_queryset(self):
+        return self.get_serializer_class().setup_eager_loading(super().get_queryset())
+
+
 @extend_schema(tags=['Categories'])
-class CategoryListCreateView(generics.ListCreateAPIView):
+class CategoryListCreateView(EagerLoadingMixin, generics.ListCreateAPIView):
     """
     List all categories or create a new category.
+    The list omits descriptions unless requested with ?include=description.
     """
-    queryset = Category.objects.all()
-    serializer_class = CategorySerializer
+    queryset = Category.objects.order_by('name')
     permission_classes = [IsAuthenticated]
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['name', 'description']
     ordering_fields = ['name', 'created_at']
 
+    def include_description(self):
+        if self.request.method not in ('GET', 'HEAD'):
+            return True
+        return 'description' in self.request.query_params.get('include', '').split(',')
+
+    def get_serializer_class(self):
+        if self.include_description():
+            return CategorySerializer
+        return CategoryListSerializer
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if not self.include_description():
+            queryset = queryset.defer('description')
+        return queryset
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                name='include',
+                type=OpenApiTypes.STR,
+                location=OpenApiParameter.QUERY,
+                description='Comma-separated optional fields to include (description)'
+            ),
+        ]
+    )
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
+    def list(self, request, *args, **kwargs):
+        key = category_list_cache_key(request.GET.urlencode())
+        data = cache.get(key)
+        if data is not None:
+            return Response(data)
+
+        response = super().list(request, *args, **kwargs)
+        cache.set(key, response.data, CATEGORY_LIST_TIMEOUT)
+        return response
+
 
 @extend_schema(tags=['Categories'])
-class CategoryRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
+class CategoryRetrieveUpdateDestroyView(EagerLoadingMixin, generics.RetrieveUpdateDestroyAPIView):
     """
     Retrieve, update or delete a category.
     """
@@ -43,17 +100,20 @@ class CategoryRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
 
 
 @extend_schema(tags=['Products'])
-class ProductListCreateView(generics.ListCreateAPIView):
+class ProductListCreateView(EagerLoadingMixin, generics.ListCreateAPIView):
     """
     List all products or create a new product.
     Supports filtering by category, status, and stock availability.
     """
-    queryset = Product.objects.select_related('category').all()
+    queryset = Product.objects.all()
     permission_classes = [IsAuthenticated]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
-    filterset_fields = ['category', 'status']
+    filterset_class = ProductFilterSet
     search_fields = ['name', 'sku', 'description']
-    ordering_fields = ['name', 'price', 'stock_quantity', 'created_at']
+    ordering_fields = [
+        'name', 'price', 'stock_quantity', 'created_at',
+        'needs_reorder_db', 'is_in_stock_db'
+    ]
 
     def get_serializer_class(self):
         if self.request.method == 'POST':
@@ -91,32 +151,56 @@ class ProductListCreateView(generics.ListCreateAPIView):
     def get(self, request, *args, **kwargs):
         return super().get(request, *args, **kwargs)
 
-    def get_queryset(self):
-        queryset = super().get_queryset()
-        low_stock = self.request.query_params.get('low_stock')
-        
-        if low_stock and low_stock.lower() == 'true':
-            queryset = [p for p in queryset if p.needs_reorder]
-            
-        return queryset
+
+@extend_schema(tags=['Products'])
+class ProductExportView(APIView):
+    """
+    Export every product as a streamed JSON array, without pagination.
+    Rows are read in chunks so memory stays flat regardless of table size.
+    """
+    permission_classes = [IsAuthenticated]
+    chunk_size = 2000
+
+    @extend_schema(responses={200: ProductListSerializer(many=True)})
+    def get(self, request):
+        return StreamingHttpResponse(self.stream(), content_type='application/json')
+
+    def stream(self):
+        encoder = JSONEncoder()
+        # One serializer instance for every row; building one per row would
+        # deep-copy the declared fields each time
+        serializer = ProductListSerializer()
+        queryset = ProductListSerializer.setup_eager_loading(Product.objects.order_by('pk'))
+
+        # PostgreSQL server-side cursors need to live inside a transaction
+        with transaction.atomic():
+            yield '['
+            for index, row in enumerate(queryset.iterator(chunk_size=self.chunk_size)):
+                if index:
+                    yield ','
+                yield encoder.encode(serializer.to_representation(row))
+            yield ']'
 
 
 @extend_schema(tags=['Products'])
-class ProductRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
+class ProductRetrieveUpdateDestroyView(EagerLoadingMixin, generics.RetrieveUpdateDestroyAPIView):
     """
     Retrieve, update or delete a product.
     """
-    queryset = Product.objects.select_related('category').all()
+    queryset = Product.objects.all()
     serializer_class = ProductDetailSerializer
     permission_classes = [IsAuthenticated]
 
 
 @extend_schema(tags=['Stock Management'])
-class StockMovementListCreateView(generics.ListCreateAPIView):
+class StockMovementListCreateView(EagerLoadingMixin, generics.ListCreateAPIView):
     """
     List all stock movements or create a new stock movement.
     """
-    queryset = StockMovement.objects.select_related('product').all()
+    queryset = StockMovement.objects.only(
+        'id', 'product', 'movement_type', 'quantity', 'notes', 'idempotency_key', 'created_at',
+        'product__sku', 'product__name'
+    )
     serializer_class = StockMovementSerializer
     permission_classes = [IsAuthenticated]
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
@@ -151,6 +235,48 @@ class StockMovementListCreateView(generics.ListCreateAPIView):
         return super().post(request, *args, **kwargs)
 
 
+@extend_schema(tags=['Stock Management'])
+class StockMovementBulkCreateView(APIView):
+    """
+    Create several stock movements at once, e.g. when receiving a shipment.
+    Each product may appear only once per batch, and a batch holds at most
+    max_batch_size items. Items carrying an idempotency_key that was already
+    recorded are not applied again.
+    """
+    permission_classes = [IsAuthenticated]
+    # Bounds the rows locked and rewritten by the single CASE UPDATE
+    max_batch_size = 500
+
+    @extend_schema(
+        request=StockMovementSerializer(many=True),
+        responses={201: StockMovementSerializer(many=True)},
+        examples=[
+            OpenApiExample(
+                'Bulk Stock In Example',
+                value=[
+                    {
+                        'product': 1, 'movement_type': 'in', 'quantity': 50,
+                        'notes': 'Shipment #42', 'idempotency_key': 'shipment-42-1'
+                    },
+                    {
+                        'product': 2, 'movement_type': 'in', 'quantity': 20,
+                        'notes': 'Shipment #42', 'idempotency_key': 'shipment-42-2'
+                    },
+                ],
+                request_only=True
+            ),
+        ]
+    )
+    def post(self, request):
+        serializer = StockMovementSerializer(
+            data=request.data, many=True, allow_empty=False, max_length=self.max_batch_size
+        )
+        if serializer.is_valid():
+            serializer.save()
+            return Response(serializer.data, status=status.HTTP_201_CREATED)
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
 @extend_schema(tags=['Stock Management'])
 class ProductStockInView(APIView):
     """
@@ -173,18 +299,23 @@ class ProductStockInView(APIView):
         ]
     )
     def post(self, request, pk):
-        try:
-            product = Product.objects.get(pk=pk)
-        except Product.DoesNotExist:
-            return Response(
-                {'error': 'Product not found'}, 
-                status=status.HTTP_404_NOT_FOUND
+        serializer = StockUpdateSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        quantity = serializer.validated_data['quantity']
+        notes = serializer.validated_data.get('notes', '')
+
+        with transaction.atomic():
+            product = get_object_or_404(
+                Product.objects.select_for_update().only('id', 'sku', 'name', 'stock_quantity'),
+                pk=pk
             )
 
-        serializer = StockUpdateSerializer(data=request.data)
-        if serializer.is_valid():
-            quantity = serializer.validated_data['quantity']
-            notes = serializer.validated_data.get('notes', '')
+            Product.objects.filter(pk=pk).update(
+                stock_quantity=F('stock_quantity') + quantity,
+                updated_at=timezone.now()
+            )
 
             movement = StockMovement.objects.create(
                 product=product,
@@ -193,14 +324,10 @@ class ProductStockInView(APIView):
                 notes=notes
             )
 
-            product.stock_quantity += quantity
-            product.save()
-
-            return Response(
-                StockMovementSerializer(movement).data,
-                status=status.HTTP_200_OK
-            )
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        return Response(
+            StockMovementSerializer(movement).data,
+            status=status.HTTP_200_OK
+        )
 
 
 @extend_schema(tags=['Stock Management'])
@@ -225,20 +352,24 @@ class ProductStockOutView(APIView):
         ]
     )
     def post(self, request, pk):
-        try:
-            product = Product.objects.get(pk=pk)
-        except Product.DoesNotExist:
-            return Response(
-                {'error': 'Product not found'}, 
-                status=status.HTTP_404_NOT_FOUND
-            )
-
         serializer = StockUpdateSerializer(data=request.data)
-        if serializer.is_valid():
-            quantity = serializer.validated_data['quantity']
-            notes = serializer.validated_data.get('notes', '')
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        quantity = serializer.validated_data['quantity']
+        notes = serializer.validated_data.get('notes', '')
 
-            if product.stock_quantity < quantity:
+        with transaction.atomic():
+            product = get_object_or_404(
+                Product.objects.select_for_update().only('id', 'sku', 'name', 'stock_quantity'),
+                pk=pk
+            )
+
+            updated = Product.objects.filter(pk=pk, stock_quantity__gte=quantity).update(
+                stock_quantity=F('stock_quantity') - quantity,
+                updated_at=timezone.now()
+            )
+            if updated == 0:
                 return Response(
                     {'error': f'Insufficient stock. Available: {product.stock_quantity}'},
                     status=status.HTTP_400_BAD_REQUEST
@@ -251,25 +382,17 @@ class ProductStockOutView(APIView):
                 notes=notes
             )
 
-            product.stock_quantity -= quantity
-            product.save()
-
-            return Response(
-                StockMovementSerializer(movement).data,
-                status=status.HTTP_200_OK
-            )
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        return Response(
+            StockMovementSerializer(movement).data,
+            status=status.HTTP_200_OK
+        )
 
 
 @extend_schema(tags=['Products'])
-class LowStockProductsView(generics.ListAPIView):
+class LowStockProductsView(EagerLoadingMixin, generics.ListAPIView):
     """
     List all products that need reordering (stock at or below reorder level).
     """
+    queryset = Product.objects.filter(needs_reorder=True)
     serializer_class = ProductListSerializer
-    permission_classes = [IsAuthenticated]
-
-    def get_queryset(self):
-        return Product.objects.select_related('category').filter(
-            stock_quantity__lte=models.F('reorder_level')
-        )
\ No newline at end of file
+    permission_classes = [IsAuthenticated]
\ No newline at end of file